@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import functools
 import os
 import platform
 import shutil
@@ -14,30 +15,78 @@ from glob import glob
 
 ROOT_DIR = Path(__file__).resolve().parent
 
+# platform.system() sondea el entorno en cada llamada; se resuelve una vez
+_SYSTEM = platform.system()
+
+# Intérprete actual cacheado una sola vez; ya es absoluto y no se resuelve el
+# symlink para no escapar de un venv (venv/bin/python3 apunta al intérprete base)
+PY_EXE = sys.executable or "python3"
+
 # Branding configurable
 ARTIFACT_PREFIX = os.environ.get("ARTIFACT_PREFIX", "OFARCHDesk")
 
 # Rutas comunes del proyecto Flutter
 FLUTTER_DIR_DEFAULT = ROOT_DIR / "flutter"
 
+# Flag de argparse -> feature de cargo
+_FLAG_FEATURES = (
+    ("hwcodec", "hwcodec"),
+    ("flutter", "flutter"),
+    ("feat_unix_file_copy_paste", "unix-file-copy-paste"),
+    ("feat_screencapturekit", "screencapturekit"),
+)
+
 def run(cmd, cwd=None, env=None, shell=False):
     """Wrapper con trazas para ejecutar comandos."""
     print(f"[RUN] {cmd}  (cwd={cwd or os.getcwd()})")
     subprocess.check_call(cmd, cwd=cwd or os.getcwd(), env=env or os.environ.copy(), shell=shell)
 
+def _fast_copy(src: Path, dst: Path):
+    """Copia con la ruta rápida del kernel (CopyFileW/sendfile) más metadatos."""
+    if _SYSTEM == "Windows":
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        if not kernel32.CopyFileW(str(src), str(dst), False):
+            raise ctypes.WinError(ctypes.get_last_error())
+        return
+    shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
 def file_exists(p: Path) -> bool:
-    return p.exists() and p.is_file()
+    # is_file() ya implica existencia; un solo stat en vez de dos
+    return p.is_file()
 
 def dir_exists(p: Path) -> bool:
-    return p.exists() and p.is_dir()
+    return p.is_dir()
+
+_VERSION_RE_B = re.compile(rb'(?m)^\s*version\s*=\s*"([^"]+)"')
+
+# Cache del parseo de Cargo.toml, invalidado por mtime
+_version_cache: dict = {}
+
+def clear_version_cache():
+    _version_cache.clear()
 
 def read_version_from_cargo() -> str:
     cargo = ROOT_DIR / "Cargo.toml"
-    if not file_exists(cargo):
+    try:
+        st = cargo.stat()
+    except OSError:
         return ""
-    txt = cargo.read_text(encoding="utf-8", errors="ignore")
-    m = re.search(r'^\s*version\s*=\s*"([^"]+)"', txt, re.M)
-    return m.group(1) if m else ""
+    key = (str(cargo), st.st_mtime)
+    if key in _version_cache:
+        return _version_cache[key]
+    version = ""
+    with open(cargo, "rb") as fh:
+        for raw in fh:
+            # Comparación de prefijo en bytes antes de aplicar el regex
+            if raw.lstrip().startswith(b"version"):
+                m = _VERSION_RE_B.match(raw)
+                if m:
+                    version = m.group(1).decode()
+                    break
+    _version_cache[key] = version
+    return version
 
 def version_value(cli_version: str) -> str:
     return cli_version or os.environ.get("VERSION") or read_version_from_cargo() or "dev"
@@ -52,11 +101,20 @@ def arch_suffix() -> str:
 
 def ensure_flutter(flutter_dir: Path):
     run(["flutter", "--version"], cwd=flutter_dir)
+    # pub get es caro (resuelve y descarga dependencias); se omite si la
+    # resolución previa sigue vigente respecto a los pubspec
+    pkg_cfg = flutter_dir / ".dart_tool" / "package_config.json"
+    if file_exists(pkg_cfg):
+        cfg_mtime = pkg_cfg.stat().st_mtime
+        specs = (flutter_dir / "pubspec.yaml", flutter_dir / "pubspec.lock")
+        if all(not s.is_file() or s.stat().st_mtime <= cfg_mtime for s in specs):
+            print("[INFO] pubspec sin cambios; flutter pub get omitido.")
+            return
     run(["flutter", "pub", "get"], cwd=flutter_dir)
 
 def cargo_build_lib(features: str):
     env = os.environ.copy()
-    if platform.system() == "Darwin":
+    if _SYSTEM == "Darwin":
         env["MACOSX_DEPLOYMENT_TARGET"] = "10.14"
     cmd = ["cargo", "build", "--lib", "--release"]
     if features:
@@ -68,7 +126,7 @@ def copy_macos_dylib_variants():
     src = ROOT_DIR / "target" / "release" / "liblibrustdesk.dylib"
     dst = ROOT_DIR / "target" / "release" / "librustdesk.dylib"
     if file_exists(src):
-        shutil.copy2(src, dst)
+        _fast_copy(src, dst)
         print(f"[INFO] Copiado {src.name} -> {dst.name}")
 
 def find_macos_app() -> Path:
@@ -78,16 +136,23 @@ def find_macos_app() -> Path:
         ROOT_DIR / "target" / "release" / "bundle" / "osx",
     ]
     for base in candidates:
-        if dir_exists(base):
-            apps = sorted(Path(base).glob("*.app"))
-            if apps:
-                return apps[0]
+        try:
+            with os.scandir(base) as it:
+                apps = sorted(de.name for de in it
+                              if de.name.endswith(".app") and de.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+        if apps:
+            return base / apps[0]
     return Path()
 
+@functools.lru_cache(maxsize=None)
 def find_windows_release_dir(flutter_dir: Path) -> Path:
-    cand = flutter_dir / "build" / "windows" / "x64" / "runner" / "Release"
-    if dir_exists(cand):
-        return cand
+    # Primero las rutas conocidas por arquitectura; rglob solo como último recurso
+    for arch in ("x64", "arm64", "x86"):
+        cand = flutter_dir / "build" / "windows" / arch / "runner" / "Release"
+        if dir_exists(cand):
+            return cand
     for p in (flutter_dir / "build").rglob("runner"):
         rel = p / "Release"
         if dir_exists(rel):
@@ -98,8 +163,20 @@ def find_windows_exe(flutter_dir: Path) -> Path:
     rel = find_windows_release_dir(flutter_dir)
     if not dir_exists(rel):
         return Path()
-    exes = sorted(rel.glob("*.exe"), key=lambda p: p.stat().st_size if p.exists() else 0, reverse=True)
-    return exes[0] if exes else Path()
+    # Una sola pasada con scandir quedándonos con el .exe más grande
+    best = None
+    best_size = -1
+    with os.scandir(rel) as it:
+        for de in it:
+            if not de.name.lower().endswith(".exe"):
+                continue
+            try:
+                size = de.stat().st_size
+            except OSError:
+                continue
+            if size > best_size:
+                best, best_size = de.path, size
+    return Path(best) if best else Path()
 
 def build_flutter_windows(flutter_dir: Path):
     ensure_flutter(flutter_dir)
@@ -117,18 +194,17 @@ def maybe_copy_service_into_app(app_path: Path):
     svc = ROOT_DIR / "target" / "release" / "service"
     dest = app_path / "Contents" / "MacOS" / "service"
     if file_exists(svc):
-        shutil.copy2(svc, dest)
+        _fast_copy(svc, dest)
         print(f"[INFO] Copiado service -> {dest}")
 
+@functools.lru_cache(maxsize=1)
 def find_create_dmg() -> Path:
     try:
-        out = subprocess.check_output(["bash", "-lc", "command -v create-dmg || true"], text=True).strip()
+        out = subprocess.check_output(
+            ["bash", "-lc", 'p=$(command -v create-dmg) && (readlink -f "$p" 2>/dev/null || echo "$p")'],
+            text=True).strip()
         if out:
-            try:
-                real = subprocess.check_output(["bash", "-lc", f"readlink -f {out} || echo {out}"], text=True).strip()
-                return Path(real)
-            except Exception:
-                return Path(out)
+            return Path(out)
     except Exception:
         pass
     return Path()
@@ -138,7 +214,7 @@ def patch_create_dmg(path: Path):
         return
     try:
         txt = path.read_text(encoding="utf-8", errors="ignore")
-        new = re.sub(r"MAXIMUM_UNMOUNTING_ATTEMPTS=3", "MAXIMUM_UNMOUNTING_ATTEMPTS=7", txt)
+        new = txt.replace("MAXIMUM_UNMOUNTING_ATTEMPTS=3", "MAXIMUM_UNMOUNTING_ATTEMPTS=7")
         if new != txt:
             path.write_text(new, encoding="utf-8")
             print("[INFO] create-dmg parchado para aumentar intentos de desmontaje")
@@ -170,6 +246,22 @@ def create_unsigned_dmg(app_path: Path, version: str):
     print(f"[OK] DMG creado: {dmg.name}")
     return dmg
 
+def _newest_mtime(*paths) -> float:
+    """Mtime más reciente entre los archivos y árboles indicados."""
+    newest = 0.0
+    for p in paths:
+        p = Path(p)
+        if p.is_dir():
+            for root, _, files in os.walk(p):
+                for f in files:
+                    try:
+                        newest = max(newest, os.stat(os.path.join(root, f)).st_mtime)
+                    except OSError:
+                        continue
+        elif p.is_file():
+            newest = max(newest, p.stat().st_mtime)
+    return newest
+
 def windows_portable_pack(flutter_dir: Path, version: str, skip_portable_pack: bool):
     if skip_portable_pack:
         print("[INFO] Empaquetado portable omitido por bandera.")
@@ -188,10 +280,20 @@ def windows_portable_pack(flutter_dir: Path, version: str, skip_portable_pack: b
     if not exe_real:
         raise RuntimeError("No se encontró el .exe generado por Flutter en Windows.")
 
+    final = ROOT_DIR / f"{ARTIFACT_PREFIX}-{version}-install.exe"
+    if file_exists(final):
+        newest_src = _newest_mtime(exe_real.parent, gen, gen.parent / "src",
+                                   gen.parent / "build.rs",
+                                   gen.parent / "Cargo.toml",
+                                   gen.parent / "Cargo.lock")
+        if final.stat().st_mtime >= newest_src:
+            print(f"[INFO] {final.name} está al día; empaquetado portable omitido.")
+            return final
+
     out_dir = gen.parent
     rel_exe_from_out = os.path.relpath(exe_real, start=out_dir).replace("\\", "/")
     cmd = [
-        sys.executable if sys.executable else "python3",
+        PY_EXE,
         str(gen.name),
         "-f", "../../" + str(exe_real.parent).replace("\\", "/"),
         "-o", ".",
@@ -199,21 +301,21 @@ def windows_portable_pack(flutter_dir: Path, version: str, skip_portable_pack: b
     ]
     run(cmd, cwd=str(out_dir))
 
+    # EAFP: mover directamente y tratar la ausencia como fallo de generate.py
     portable_exe = out_dir / "rustdesk_portable.exe"
-    if file_exists(portable_exe):
-        final = ROOT_DIR / f"{ARTIFACT_PREFIX}-{version}-install.exe"
+    try:
         shutil.move(str(portable_exe), str(final))
-        print(f"[OK] Instalador portable creado: {final.name}")
-        return final
-
-    print("[WARN] No se generó rustdesk_portable.exe. Verifica generate.py.")
-    return None
+    except FileNotFoundError:
+        print("[WARN] No se generó rustdesk_portable.exe. Verifica generate.py.")
+        return None
+    print(f"[OK] Instalador portable creado: {final.name}")
+    return final
 
 def rename_android_apk(flutter_dir: Path, version: str):
     apk = flutter_dir / "build" / "app" / "outputs" / "flutter-apk" / "app-release.apk"
     if file_exists(apk):
         final = ROOT_DIR / f"{ARTIFACT_PREFIX}-{version}-android.apk"
-        shutil.copy2(apk, final)
+        _fast_copy(apk, final)
         print(f"[OK] APK copiado como {final.name}")
         return final
     print("[WARN] APK release no encontrado. Revisa la salida de Flutter.")
@@ -241,33 +343,27 @@ def main():
     args = parser.parse_args()
 
     version = version_value(args.version)
-    flutter_dir = Path(args.flutter_dir).resolve()
-
-    # Features por defecto
-    feats = []
-    if args.hwcodec:
-        feats.append("hwcodec")
-    if args.flutter:
-        feats.append("flutter")
+    # FLUTTER_DIR_DEFAULT ya está resuelto; solo rutas personalizadas necesitan resolve()
+    if args.flutter_dir == str(FLUTTER_DIR_DEFAULT):
+        flutter_dir = FLUTTER_DIR_DEFAULT
+    else:
+        flutter_dir = Path(args.flutter_dir).resolve()
 
-    # Auto para macOS, puedes mantenerlo o quitarlo. Duplicados se eliminan más abajo.
-    if platform.system() == "Darwin":
-        feats += ["unix-file-copy-paste", "screencapturekit"]
+    # Features según flags CLI; el set elimina duplicados directamente
+    feats = {name for attr, name in _FLAG_FEATURES if getattr(args, attr, False)}
 
-    # Flags explícitos del workflow
-    if getattr(args, "feat_unix_file_copy_paste", False):
-        feats.append("unix-file-copy-paste")
-    if getattr(args, "feat_screencapturekit", False):
-        feats.append("screencapturekit")
+    # Auto para macOS, puedes mantenerlo o quitarlo.
+    if _SYSTEM == "Darwin":
+        feats.update(("unix-file-copy-paste", "screencapturekit"))
 
     # Mezcla con --features manuales si las pasas
-    manual_feats = [f.strip() for f in args.features.split(",") if f.strip()]
-    all_feats = ",".join(sorted(set(feats + manual_feats)))
+    feats.update(f.strip() for f in args.features.split(",") if f.strip())
+    all_feats = ",".join(sorted(feats))
 
     # Plataforma objetivo
     target = args.platform
     if target == "auto":
-        sysname = platform.system()
+        sysname = _SYSTEM
         if sysname == "Windows":
             target = "windows"
         elif sysname == "Darwin":
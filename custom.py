@@ -17,20 +17,25 @@ required_packages = [
     'ttkthemes'  # Ensure ttkthemes is installed
 ]
 
-def install(package):
-    """Function to install package using pip."""
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
+def install(packages):
+    """Function to install packages using pip in a single invocation."""
+    subprocess.check_call([sys.executable, '-m', 'pip', 'install',
+                           '--disable-pip-version-check', '--no-input'] + list(packages))
 
-# Check for required packages
+# Check for required packages and install the missing ones in one pip run
+missing_packages = []
 for package in required_packages:
     try:
         __import__(package)
     except ImportError:
-        print(f"{package} is not installed. Installing...")
-        install(package)
+        print(f"{package} is not installed. Queued for install...")
+        missing_packages.append(package)
     else:
         print(f"{package} is already installed.")
 
+if missing_packages:
+    install(missing_packages)
+
 # Global variables for the entry fields
 app_name_entry = None
 executable_name_entry = None
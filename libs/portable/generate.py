@@ -2,6 +2,8 @@
 
 import os
 import optparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import md5
 import brotli
 import datetime
@@ -14,24 +16,29 @@ encoding = 'utf-8'
 # output: {path: (compressed_data, file_md5)}
 
 
+def compress_one(full_path: str, level):
+    with open(full_path, "rb") as f:
+        content = f.read()
+    content_compressed = brotli.compress(content, quality=level)
+    md5_code = md5(content).hexdigest().encode(encoding=encoding)
+    return (content_compressed, md5_code)
+
+
 def generate_md5_table(folder: str, level) -> dict:
     res: dict = dict()
-    curdir = os.curdir
-    os.chdir(folder)
-    for root, _, files in os.walk('.'):
-        # remove ./
+    entries = []
+    for root, _, files in os.walk(folder):
+        rel_root = os.path.relpath(root, folder)
         for f in files:
-            md5_generator = md5()
-            full_path = os.path.join(root, f)
-            print(f"Processing {full_path}...")
-            f = open(full_path, "rb")
-            content = f.read()
-            content_compressed = brotli.compress(
-                content, quality=level)
-            md5_generator.update(content)
-            md5_code = md5_generator.hexdigest().encode(encoding=encoding)
-            res[full_path] = (content_compressed, md5_code)
-    os.chdir(curdir)
+            # same './'-prefixed keys as the old chdir-based walk
+            key = os.path.join('.', f) if rel_root == '.' else os.path.join('.', rel_root, f)
+            entries.append((key, os.path.join(root, f)))
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        futures = [pool.submit(compress_one, full_path, level)
+                   for _, full_path in entries]
+        for (key, _), future in zip(entries, futures):
+            print(f"Processing {key}...")
+            res[key] = future.result()
     return res
 
 
@@ -65,11 +72,10 @@ def write_app_metadata(output_folder: str):
     print(f"App metadata has been written to {output_path}")
 
 def build_portable(output_folder: str, target: str):
-    os.chdir(output_folder)
+    cmd = ["cargo", "build", "--release"]
     if target:
-        os.system("cargo build --release --target " + target)
-    else:
-        os.system("cargo build --release")
+        cmd += ["--target", target]
+    subprocess.run(cmd, check=True, cwd=output_folder)
 
 # Linux: python3 generate.py -f ../rustdesk-portable-packer/test -o . -e ./test/main.py
 # Windows: python3 .\generate.py -f ..\rustdesk\flutter\build\windows\runner\Debug\ -o . -e ..\rustdesk\flutter\build\windows\runner\Debug\rustdesk.exe